@@ -3,9 +3,9 @@
 Logs into your PythonAnywhere account and extend the expiry date.
 """
 
-__all__ = ['run', 'check']
+__all__ = ['run', 'check', 'Session']
 __version__ = '0.3.2'
 __author__ = 'Lydia Zhang'
 
-from pythonanywhere_3_months.core import run
+from pythonanywhere_3_months.core import run, Session
 from pythonanywhere_3_months.last_run import check
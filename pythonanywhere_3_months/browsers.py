@@ -2,21 +2,38 @@
 # browsers.py
 """Installs and launches browsers."""
 
+from collections.abc import Callable
 from logging import Logger
 import os
 from playwright.sync_api import Playwright, Browser
 import subprocess
 import sys
+from time import monotonic
 
-from pythonanywhere_3_months.config import Config
+from pythonanywhere_3_months.config import Config, TIMEOUT
+from pythonanywhere_3_months.metrics import RunMetrics
+from pythonanywhere_3_months.processes import rss
 from pythonanywhere_3_months.startup import default_logger
+from pythonanywhere_3_months.watchdog import Watchdog
+
+
+RECYCLE_MSG = "Relaunching the browser (%s)."
 
 
 def get_browser(
-    p: Playwright, config: Config, logger: Logger = default_logger
+    p: Playwright,
+    config: Config,
+    logger: Logger = default_logger,
+    before_install: Callable[[], object] | None = None,
+    install: bool = True,
 ) -> Browser | None:
     """Installs and returns a Browser object.
 
+    If the browser needs to be installed, `before_install` is called first,
+    e.g. to wait until the user is done with the terminal, since installing
+    may ask for sudo permissions. If `install` is not set, a failed launch
+    raises instead.
+
     If in headless mode without setting `--headless-shell`, use the
     new chromium headless mode instead of a separate chromium headless shell.
     See:
@@ -34,17 +51,24 @@ def get_browser(
     logger.debug(f"Options: {kwargs}")
 
     env = os.environ.copy()  # including PLAYWRIGHT_BROWSERS_PATH
+    # Install output goes to stderr, stdout may carry JSON line results
     browser: Browser | None = None
     # Launch
     try:
         browser = getattr(p, config.browser_name).launch(**kwargs)
         # browser = p.chromium.launch(**kwargs)
-    except Exception:
-        pass
+    except Exception as e:
+        if not install:
+            logger.error(
+                f"{config.browser_name} not launched:\n{type(e).__name__}: {e}"
+            )
+            raise RuntimeError from e
     else:
         return browser
 
     # If browser not found, install
+    if before_install:
+        before_install()
     deps_cmd = [sys.executable, '-m', 'playwright', 'install-deps']
     cmd = [sys.executable, '-m', 'playwright', 'install']
     # For chromium (headless)
@@ -65,7 +89,9 @@ def get_browser(
     # Install system dependencies
     logger.info(f"Installing system dependencies for {config.browser_name}...")
     try:
-        subprocess.run(deps_cmd, text=True, check=True, env=env)
+        subprocess.run(
+            deps_cmd, text=True, check=True, env=env, stdout=sys.stderr
+        )
     except subprocess.CalledProcessError as e:
         logger.error(
             f"Unable to install dependencies for {config.browser_name}:"
@@ -81,7 +107,9 @@ def get_browser(
     # Install browser
     logger.info(f"Installing {config.browser_name}...")
     try:
-        subprocess.run(cmd, text=True, check=True, env=env)
+        subprocess.run(
+            cmd, text=True, check=True, env=env, stdout=sys.stderr
+        )
     except subprocess.CalledProcessError as e:
         logger.error(f"Error installing '{config.browser_name}': {e}")
         raise RuntimeError from e
@@ -98,3 +126,98 @@ def get_browser(
         raise RuntimeError from e
     else:
         return browser
+
+
+class BrowserRecycler:
+    """Launches the browser and relaunches it between accounts when the
+    recycling policy in the config says so: after a number of contexts, after
+    an uptime, or when the memory of the browser processes passes a threshold.
+    """
+
+    def __init__(
+        self,
+        p: Playwright,
+        config: Config,
+        logger: Logger = default_logger,
+        metrics: RunMetrics | None = None,
+        watchdog: Watchdog | None = None,
+        before_install: Callable[[], object] | None = None,
+    ) -> None:
+        self.p: Playwright = p
+        self.config: Config = config
+        self.logger: Logger = logger
+        self.metrics: RunMetrics = metrics or RunMetrics()
+        self.watchdog: Watchdog = watchdog or Watchdog()
+        self.before_install: Callable[[], object] | None = before_install
+        self.browser: Browser | None = None
+        self.contexts: int = 0
+        self.launches: int = 0
+        self.launched_at: float = 0.0
+
+    def acquire(self) -> Browser:
+        """Returns the browser for the next account, relaunching it first if
+        it is due for recycling or disconnected.
+        """
+        if self.browser:
+            reason = self.recycle_reason()
+            if reason:
+                self.logger.info(RECYCLE_MSG % reason)
+                # A hung close is killed by the watchdog
+                with self.watchdog.deadline(TIMEOUT / 1000):
+                    self.close()
+                self.metrics.recycles += 1
+            elif not self.browser.is_connected():
+                self.browser = None
+
+        browser = self.launch()
+        self.contexts += 1
+        return browser
+
+    def launch(self) -> Browser:
+        """Launches the browser if it is not running and returns it.
+
+        Only the first launch may install the browser, a relaunch that fails
+        (e.g. on a killed driver) raises instead.
+        """
+        if self.browser is None:
+            self.browser = get_browser(
+                self.p,
+                self.config,
+                self.logger,
+                self.before_install,
+                install=not self.launches,
+            )
+            self.launches += 1
+            if self.browser is None:
+                self.logger.error(
+                    f"{self.config.browser_name} not launched: "
+                    "unknown error occurred."
+                )
+                raise RuntimeError
+            self.contexts = 0
+            self.launched_at = monotonic()
+        return self.browser
+
+    def recycle_reason(self) -> str:
+        """Returns why the browser is due for recycling, or '' if it is not."""
+        config = self.config
+        if config.recycle_contexts and self.contexts >= config.recycle_contexts:
+            return f"{self.contexts} contexts"
+        uptime = monotonic() - self.launched_at
+        if config.recycle_uptime and uptime >= config.recycle_uptime:
+            return f"uptime {uptime:.0f}s"
+        if config.recycle_rss:
+            # Only the browsers under our drivers
+            mib = rss(self.watchdog.drivers) / 2**20
+            if mib >= config.recycle_rss:
+                return f"RSS {mib:.0f} MiB"
+        return ''
+
+    def close(self) -> None:
+        """Gracefully closes the browser."""
+        if self.browser:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
@@ -2,25 +2,30 @@
 # cli.py
 """CLI interface and main entry point."""
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger
 import os
 import sys
+from typing import NoReturn
 
 from pythonanywhere_3_months.config import (
     CREDENTIAL_ABSOLUTE_PATH,
+    Config,
     load_config,
 )
 from pythonanywhere_3_months.startup import (
     get_args_and_logger,
     get_credentials,
 )
-from pythonanywhere_3_months.core import run
+from pythonanywhere_3_months.core import Session
+from pythonanywhere_3_months.processes import kill_tree
+from pythonanywhere_3_months.stream import read_lines, run_stream
 
 
 def main() -> None:
     """Gets CLI arguments and runs application."""
     try:
         args, logger = get_args_and_logger()
-        credentials = get_credentials(CREDENTIAL_ABSOLUTE_PATH, logger)
         config = load_config(args)
     except KeyboardInterrupt:
         print("\nInterrupted by user.", file=sys.stderr)
@@ -29,10 +34,78 @@ def main() -> None:
         print(f"{type(e).__name__}: {e}", file=sys.stderr)
         sys.exit(1)
 
+    if args.accounts:
+        try:
+            if run_stream(read_lines(args.accounts), config, logger):
+                sys.exit(1)
+        except KeyboardInterrupt:
+            interrupted()
+        except Exception:
+            sys.exit(1)
+        return
+
+    # Start the driver and launch the browser in the background
+    # while the credentials are loaded, which may prompt the user
+    credentials: Future[dict[str, str]] = Future()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="run")
+    task = executor.submit(run_when_loaded, credentials, config, logger)
+
     try:
-        run(credentials, config, logger)
+        # A replayed run needs no credentials
+        credentials.set_result(
+            {}
+            if config.replay_har
+            else get_credentials(CREDENTIAL_ABSOLUTE_PATH, logger)
+        )
     except KeyboardInterrupt:
+        cancel(credentials, executor)
         print("\nInterrupted by user.", file=sys.stderr)
-        os._exit(130)
+        sys.exit(130)
+    except Exception as e:
+        cancel(credentials, executor)
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        task.result()
+    except KeyboardInterrupt:
+        interrupted()
     except Exception:
         sys.exit(1)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def run_when_loaded(
+    credentials: Future[dict[str, str]],
+    config: Config,
+    logger: Logger,
+) -> None:
+    """Runs with credentials that are still being loaded.
+
+    The driver and the browser are started meanwhile, but a missing browser
+    is not installed until the credentials are loaded. If the future is
+    cancelled or fails, the browser is closed and the error is raised.
+    """
+    with Session(config, logger, before_install=credentials.result) as session:
+        session.process(credentials.result())
+        if not config.test:
+            logger.info("Done!")
+
+
+def cancel(
+    credentials: Future[dict[str, str]], executor: ThreadPoolExecutor
+) -> None:
+    """Cancels the run waiting for credentials and waits for the
+    early-launched browser to close.
+    """
+    credentials.cancel()
+    executor.shutdown(wait=True)
+
+
+def interrupted() -> NoReturn:
+    """Exits immediately on interrupt."""
+    print("\nInterrupted by user.", file=sys.stderr)
+    # os._exit skips cleanup, so do not leave the browsers behind
+    kill_tree()
+    os._exit(130)
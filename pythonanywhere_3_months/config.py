@@ -38,6 +38,21 @@ TARGET_URL_SUBDIR: str = os.getenv('TARGET_URL_SUBDIR', "webapps")
 # Timeout in milliseconds
 TIMEOUT = int(os.getenv('TIMEOUT', 30000))
 
+# Wall-clock deadlines in seconds (0: no deadline)
+ACCOUNT_TIMEOUT = float(os.getenv('ACCOUNT_TIMEOUT', 300))
+RUN_TIMEOUT = float(os.getenv('RUN_TIMEOUT', 0))
+
+# Browser recycling policy (0: never)
+RECYCLE_CONTEXTS = int(os.getenv('RECYCLE_CONTEXTS', 50))
+RECYCLE_UPTIME = float(os.getenv('RECYCLE_UPTIME', 1800))  # seconds
+RECYCLE_RSS = int(os.getenv('RECYCLE_RSS', 0))  # MiB
+
+# Input profiles: fill instantly, or type with a random per-keystroke delay
+INPUT_PROFILE_CHOICES = ['instant', 'human', 'custom']
+INPUT_PROFILE: str = os.getenv('INPUT_PROFILE', 'human')
+# Per-keystroke delay range in milliseconds
+HUMAN_INPUT_DELAY: tuple[float, float] = (50.0, 100.0)
+
 # Available browsers
 BROWSER_CHOICES = ['chromium', 'firefox', 'webkit']
 
@@ -52,6 +67,23 @@ class Config(NamedTuple):
         headed_mode (bool): Headed mode
         browser_name (str): Browser name
         headless_shell (bool): Use a separate chromium headless shell
+        account_timeout (float): Deadline in seconds for each account
+            (0: no deadline)
+        run_timeout (float): Deadline in seconds for the whole run
+            (0: no deadline)
+        record_har (Path | None): Record the network traffic to a HAR file
+        replay_har (Path | None): Serve the network traffic from a HAR file
+        recycle_contexts (int): Relaunch the browser after this many contexts
+            (0: never)
+        recycle_uptime (float): Relaunch the browser after this many seconds
+            (0: never)
+        recycle_rss (int): Relaunch the browser when the child processes use more
+            MiB of memory than this (0: never)
+        input_profile (str): How to enter the credentials, one of
+            `INPUT_PROFILE_CHOICES`
+        input_delay (tuple[float, float]): Per-keystroke delay range in
+            milliseconds for the 'custom' input profile
+        profile (Path | None): Write a browser and Python profile report
     """
 
     peek_only: bool
@@ -60,10 +92,36 @@ class Config(NamedTuple):
     headed_mode: bool
     browser_name: str
     headless_shell: bool
+    account_timeout: float = ACCOUNT_TIMEOUT
+    run_timeout: float = RUN_TIMEOUT
+    record_har: Path | None = None
+    replay_har: Path | None = None
+    recycle_contexts: int = RECYCLE_CONTEXTS
+    recycle_uptime: float = RECYCLE_UPTIME
+    recycle_rss: int = RECYCLE_RSS
+    input_profile: str = INPUT_PROFILE
+    input_delay: tuple[float, float] = HUMAN_INPUT_DELAY
+    profile: Path | None = None
 
 
 def load_config(args: Namespace) -> Config:
-    """Loads configuration from args."""
+    """Loads configuration from args.
+
+    Raises:
+        ValueError: If the input profile or delay is invalid. Argparse does
+            not check defaults from environment variables against choices.
+    """
+    if args.input not in INPUT_PROFILE_CHOICES:
+        raise ValueError(
+            f"Invalid input profile {args.input!r}, choose from: "
+            f"{', '.join(INPUT_PROFILE_CHOICES)}"
+        )
+    low, high = args.input_delay
+    if not 0 <= low <= high:
+        raise ValueError(
+            f"Invalid input delay {low:g} {high:g}, "
+            "expected 0 <= min <= max"
+        )
     return Config(
         peek_only=args.peek,
         debug=args.debug,
@@ -71,4 +129,14 @@ def load_config(args: Namespace) -> Config:
         headed_mode=args.headed,
         browser_name=args.browser,
         headless_shell=args.shell,
+        account_timeout=args.account_timeout,
+        run_timeout=args.run_timeout,
+        record_har=args.record_har,
+        replay_har=args.replay_har,
+        recycle_contexts=args.recycle_contexts,
+        recycle_uptime=args.recycle_uptime,
+        recycle_rss=args.recycle_rss,
+        input_profile=args.input,
+        input_delay=(low, high),
+        profile=args.profile,
     )
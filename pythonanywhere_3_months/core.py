@@ -2,30 +2,49 @@
 # core.py
 """Main functions to log in and click the button."""
 
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
 from logging import Logger
 from playwright.sync_api import (
     sync_playwright,
     Browser,
     BrowserContext,
+    CDPSession,
     Page,
+    Playwright,
     TimeoutError,
 )
 import random
-from time import time
-import traceback
+from time import monotonic, time
 from types import TracebackType
 from typing import Self, Literal
 
 from pythonanywhere_3_months.config import (
     Config,
+    HUMAN_INPUT_DELAY,
     LAST_RUN_AT_ABSOLUTE_PATH,
     LOGIN_PAGE_URL,
     TARGET_URL_SUBDIR,
     TIMEOUT,
 )
-from pythonanywhere_3_months.startup import default_logger
-from pythonanywhere_3_months.browsers import get_browser
+from pythonanywhere_3_months.startup import (
+    current_account,
+    default_logger,
+    log_phase,
+)
+from pythonanywhere_3_months.browsers import BrowserRecycler
+from pythonanywhere_3_months.har import (
+    REPLAY_SEED,
+    account_path,
+    SCRUBBED_CREDENTIALS,
+    context_options,
+    scrub,
+)
+from pythonanywhere_3_months.metrics import RunMetrics
+from pythonanywhere_3_months.processes import driver_pid
+from pythonanywhere_3_months.profiling import Profiler
 from pythonanywhere_3_months.selectors import Selectors
+from pythonanywhere_3_months.watchdog import Watchdog
 
 
 TIMEOUT_ERR_TEMPLATE = "Timeout %s after %gs."
@@ -35,6 +54,7 @@ EXTENDED_MSG = "Expiry date extended successfully."
 TEST_MSG = "*** Test only (no operation) ***"
 PEEK_MSG = "*** Peek only (no clicking) ***"
 BROWSER_CLOSED_MSG = "Browser closed."
+HAR_SAVED_MSG = "Saved HAR: %s"
 
 
 class PageManager:
@@ -49,24 +69,49 @@ class PageManager:
         url_sub_dir: str,
         config: Config,
         logger: Logger = default_logger,
+        watchdog: Watchdog | None = None,
+        metrics: RunMetrics | None = None,
+        profiler: Profiler | None = None,
     ) -> None:
         self.browser: Browser = browser
-        self.credentials: dict[str, str] = credentials
+        # A replayed HAR was recorded with scrubbed credentials
+        self.credentials: dict[str, str] = (
+            SCRUBBED_CREDENTIALS if config.replay_har else credentials
+        )
         self.home_url: str = home_url
         self.url_sub_dir: str = url_sub_dir
         self.sub_url: str = ''
         self.config: Config = config
         self.logger: Logger = logger
+        self.watchdog: Watchdog | None = watchdog
+        self.metrics: RunMetrics = metrics or RunMetrics()
+        self.profiler: Profiler | None = profiler
+        self.cdp: CDPSession | None = None
+        self.timeout: float = TIMEOUT
         self.context: BrowserContext | None = None
         self.page: Page | None = None
         self.is_logged_in: bool = False
+        self.expiry_date: str = ''
+        # Seconds spent in each phase
+        self.timings: dict[str, float] = {}
+        self.random: random.Random = random.Random(
+            REPLAY_SEED if config.replay_har else None
+        )
 
     def __enter__(self) -> Self:
-        self.page = self.open_page()
-        if self.context:
-            self.context.set_default_timeout(TIMEOUT)
-        if not self.config.test:
-            self.log_in()
+        try:
+            with log_phase('open_page', self.logger, self.timings):
+                self.page = self.open_page()
+                if self.profiler and self.context:
+                    self.cdp = self.profiler.attach(self.context, self.page)
+            self.apply_deadline()
+            if not self.config.test:
+                with log_phase('log_in', self.logger, self.timings):
+                    self.log_in()
+        except BaseException:
+            # __exit__ is not called
+            self.close()
+            raise
         return self
 
     def __exit__(
@@ -76,13 +121,21 @@ class PageManager:
         exc_tb: TracebackType | None,
     ) -> Literal[False]:
         if self.is_logged_in:
-            self.log_out()
+            with log_phase('log_out', self.logger, self.timings):
+                self.log_out()
         self.close()
         return False
 
     def open_page(self) -> Page:
         if not self.context:
-            self.context = self.browser.new_context()  # incognito
+            # incognito
+            self.context = self.browser.new_context(
+                **context_options(self.config)
+            )
+            if self.config.replay_har:
+                self.context.route_from_har(
+                    self.config.replay_har, not_found='abort'
+                )
         return self.context.new_page()
 
     def close(self) -> None:
@@ -92,6 +145,35 @@ class PageManager:
                 self.context.close()
             except Exception:
                 pass
+            # The HAR file is written on closing
+            if self.config.record_har and self.config.record_har.is_file():
+                scrub(self.config.record_har, self.credentials)
+                self.logger.info(HAR_SAVED_MSG % self.config.record_har)
+
+    def apply_deadline(self) -> None:
+        """Shortens the default timeout to the time left before the deadline.
+
+        Raises:
+            DeadlineExceeded: If the deadline has passed.
+        """
+        self.timeout = TIMEOUT
+        if self.watchdog:
+            remaining = self.watchdog.remaining()
+            if remaining is not None:
+                self.timeout = min(TIMEOUT, remaining * 1000)
+        if self.context:
+            self.context.set_default_timeout(self.timeout)
+
+    @contextmanager
+    def profiling(self, label: str) -> Iterator[None]:
+        """Samples the browser performance around a navigation if
+        profiling.
+        """
+        if self.profiler and self.page:
+            with self.profiler.around(self.page, self.cdp, label):
+                yield
+        else:
+            yield
 
     def print_error(
         self, exc: Exception | BaseException, max_level: int = 5
@@ -111,13 +193,13 @@ class PageManager:
                 return
 
     @staticmethod
-    def goto_page(page: Page, url: str) -> None:
+    def goto_page(page: Page, url: str, timeout: float = TIMEOUT) -> None:
         """Navigates to the page."""
         try:
-            page.goto(url, wait_until='domcontentloaded')
+            page.goto(url, wait_until='domcontentloaded', timeout=timeout)
         except TimeoutError:
             raise TimeoutError(
-                TIMEOUT_ERR_TEMPLATE % (f"loading {url}", TIMEOUT / 1000)
+                TIMEOUT_ERR_TEMPLATE % (f"loading {url}", timeout / 1000)
             ) from None
         except Exception as e:
             raise RuntimeError(f"Unable to load {url}.") from e
@@ -130,27 +212,28 @@ class PageManager:
         if not self.page:
             self.page = self.open_page()
 
-        self.goto_page(self.page, self.home_url)
+        self.apply_deadline()
+        with self.profiling('goto_page'):
+            self.goto_page(self.page, self.home_url, self.timeout)
 
         # Enter username and password
-        self.page.type(
-            Selectors.USERNAME,
-            self.credentials["username"],
-            delay=random.uniform(50, 100),
-        )
-        self.page.type(
-            Selectors.PASSWORD,
-            self.credentials["password"],
-            delay=random.uniform(50, 100),
-        )
+        input_time = self.timings.get('input', 0.0)
+        with log_phase('input', self.logger, self.timings):
+            self.enter_text(Selectors.USERNAME, self.credentials["username"])
+            self.enter_text(Selectors.PASSWORD, self.credentials["password"])
+        self.metrics.input_time += self.timings['input'] - input_time
 
         # Click 'Log in'
+        self.apply_deadline()
         try:
-            with self.page.expect_navigation():
+            with (
+                self.profiling('expect_navigation'),
+                self.page.expect_navigation(),
+            ):
                 self.page.click(Selectors.LOGIN_BUTTON)
         except TimeoutError:
             raise TimeoutError(
-                TIMEOUT_ERR_TEMPLATE % ("logging in", TIMEOUT / 1000)
+                TIMEOUT_ERR_TEMPLATE % ("logging in", self.timeout / 1000)
             ) from None
 
         # Check if there is any error messages
@@ -173,12 +256,30 @@ class PageManager:
         self.is_logged_in = True
         self.logger.info(self.LOGGED_IN_MSG)
 
+    def enter_text(self, selector: str, text: str) -> None:
+        """Enters text into a field with the configured input profile."""
+        if not self.page:
+            raise RuntimeError("Page closed.")
+
+        profile = self.config.input_profile
+        if profile == 'instant':
+            self.page.fill(selector, text)
+            return
+        if profile == 'human':
+            low, high = HUMAN_INPUT_DELAY
+        elif profile == 'custom':
+            low, high = self.config.input_delay
+        else:
+            raise ValueError(f"Invalid input profile {profile!r}.")
+        self.page.type(selector, text, delay=self.random.uniform(low, high))
+
     def log_out(self) -> None:
         """Logs out."""
         if not self.page:
             return
 
         try:
+            self.apply_deadline()
             self.page.click(Selectors.LOGOUT_BUTTON)
         except Exception as e:
             self.logger.error(f"Error logging out:\n{type(e).__name__}: {e}")
@@ -196,22 +297,25 @@ class PageManager:
         if not self.sub_url:
             return
 
-        self.goto_page(self.page, self.sub_url)
+        self.apply_deadline()
+        with self.profiling('goto_page'):
+            self.goto_page(self.page, self.sub_url, self.timeout)
 
         date_locator = self.page.locator(Selectors.EXPIRY_DATE_TAG).describe(
             "Date"
         )
         try:
-            date_locator.wait_for(state="visible", timeout=TIMEOUT)
+            date_locator.wait_for(state="visible", timeout=self.timeout)
         except TimeoutError:
             raise TimeoutError(
                 TIMEOUT_ERR_TEMPLATE
-                % ('looking for expiry date', TIMEOUT / 1000)
+                % ('looking for expiry date', self.timeout / 1000)
             ) from None
 
         if self.config.peek_only:
+            self.expiry_date = date_locator.inner_text()
             self.logger.info(PEEK_MSG)
-            self.logger.info(CURRENT_DATE_TEMPLATE % date_locator.inner_text())
+            self.logger.info(CURRENT_DATE_TEMPLATE % self.expiry_date)
             return
         else:
             self.logger.info(INITIAL_DATE_TEMPLATE % date_locator.inner_text())
@@ -221,82 +325,246 @@ class PageManager:
             raise RuntimeError("Extend button not found or disabled.")
 
         # The page will reload once the button is clicked
+        self.apply_deadline()
         try:
-            with self.page.expect_navigation():
+            with (
+                self.profiling('expect_navigation'),
+                self.page.expect_navigation(),
+            ):
                 btn_locator.click()
         except TimeoutError:
             raise TimeoutError(
-                TIMEOUT_ERR_TEMPLATE % ("reloading the page", TIMEOUT / 1000)
+                TIMEOUT_ERR_TEMPLATE
+                % ("reloading the page", self.timeout / 1000)
             ) from None
         else:
             self.logger.info(EXTENDED_MSG)
         finally:
-            date = date_locator.inner_text()
-            self.logger.info(CURRENT_DATE_TEMPLATE % date)
+            self.expiry_date = date_locator.inner_text()
+            self.logger.info(CURRENT_DATE_TEMPLATE % self.expiry_date)
 
 
-def run(
+def run_account(
+    browser: Browser,
     credentials: dict[str, str],
     config: Config,
     logger: Logger = default_logger,
-) -> None:
-    """Main function to run the application."""
-    with sync_playwright() as p:
-        browser = get_browser(p, config, logger)
-        if browser is None:
-            logger.error(
-                f"{config.browser_name} not launched: unknown error occurred."
-            )
-            raise RuntimeError
-
-        try:
-            # Open page and log in
-            with PageManager(
-                browser,
-                credentials,
-                LOGIN_PAGE_URL,
-                TARGET_URL_SUBDIR,
-                config,
-                logger,
-            ) as pm:
-                if config.test:
-                    logger.info(TEST_MSG)
-                    return
-
-                # Go from 'Dashboard' to 'Web' tab --------------------|
-                # Click 'Run until 3 months from today'
+    watchdog: Watchdog | None = None,
+    metrics: RunMetrics | None = None,
+    profiler: Profiler | None = None,
+    timings: dict[str, float] | None = None,
+) -> PageManager:
+    """Logs in, extends the expiry date and logs out of one account.
+
+    Returns the page manager holding the expiry date and the timings.
+    Errors are logged and re-raised. Pass `timings` to get the timings of a
+    failed account too.
+    """
+    if metrics is None:
+        metrics = RunMetrics()
+    if watchdog is None:
+        watchdog = Watchdog()
+    metrics.accounts += 1
+    account_token = current_account.set(credentials.get('username'))
+    pm = PageManager(
+        browser,
+        credentials,
+        LOGIN_PAGE_URL,
+        TARGET_URL_SUBDIR,
+        config,
+        logger,
+        watchdog,
+        metrics,
+        profiler,
+    )
+    if timings is not None:
+        pm.timings = timings
+    start = monotonic()
+
+    try:
+        # Open page and log in
+        with watchdog.account(), pm:
+            if config.test:
+                logger.info(TEST_MSG)
+                return pm
+
+            # Go from 'Dashboard' to 'Web' tab ------------------------|
+            # Click 'Run until 3 months from today'
+            with log_phase('extend_expiry_date', logger, pm.timings):
                 pm.extend_expiry_date()
 
-                # Save current time to a file -------------------------|
+            # Save current time to a file -----------------------------|
+            if not config.replay_har:
                 with open(LAST_RUN_AT_ABSOLUTE_PATH, "w") as f:
                     f.write(str(time()))
 
-        except TimeoutError as e:
-            pm.print_error(e, max_level=2)
-            raise
+    except TimeoutError as e:
+        pm.print_error(e, max_level=2)
+        raise
+
+    # Chained exceptions are handled here
+    except RuntimeError as e:
+        pm.print_error(e)
+        raise
 
-        # Chained exceptions are handled here
-        except RuntimeError as e:
+    # Other unexpected exceptions
+    except Exception as e:
+        if config.debug:
+            logger.exception(f"{type(e).__name__}: {e}")
+        else:
             pm.print_error(e)
-            raise
+        raise
 
-        # Other unexpected exceptions
-        except Exception as e:
-            if config.debug:
-                traceback.print_exc()
-            else:
-                pm.print_error(e)
+    finally:
+        pm.timings['total'] = monotonic() - start
+        current_account.reset(account_token)
+
+    return pm
+
+
+class Session:
+    """Keeps Playwright and the browser running for several accounts.
+
+    The run deadline starts with the first account. `before_install` is
+    called before installing a missing browser.
+
+    Usage:
+        with Session(config) as session:
+            session.extend(credentials)
+            date = session.peek(other_credentials)
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger = default_logger,
+        metrics: RunMetrics | None = None,
+        before_install: Callable[[], object] | None = None,
+    ) -> None:
+        self.config: Config = config
+        self.logger: Logger = logger
+        self.metrics: RunMetrics = metrics or RunMetrics()
+        self.watchdog: Watchdog = Watchdog(
+            config.account_timeout, config.run_timeout, logger
+        )
+        self.profiler: Profiler = Profiler(config.profile, logger)
+        self.playwright: Playwright | None = None
+        self.recycler: BrowserRecycler | None = None
+        self.before_install: Callable[[], object] | None = before_install
+        # Number of accounts recorded to HAR files
+        self.recorded: int = 0
+        self._stack: ExitStack = ExitStack()
+
+    def __enter__(self) -> Self:
+        start = monotonic()
+        try:
+            self._stack.enter_context(self.profiler)
+            manager = sync_playwright()
+            self.playwright = self._stack.enter_context(manager)
+            # Exits first, so it never kills a driver Playwright has reaped
+            self._stack.enter_context(self.watchdog)
+            # Track the driver, so the watchdog only kills what we started
+            pid = driver_pid(manager)
+            if pid is not None:
+                self.watchdog.track([pid])
+            self.recycler = BrowserRecycler(
+                self.playwright,
+                self.config,
+                self.logger,
+                self.metrics,
+                self.watchdog,
+                self.before_install,
+            )
+            self.recycler.launch()
+        except BaseException:
+            self._stack.close()
             raise
+        self.metrics.launch_time = monotonic() - start
+        return self
 
-        else:
-            logger.info("Done!")
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> Literal[False]:
+        try:
+            self.close()
+        finally:
+            self._stack.__exit__(exc_type, exc_val, exc_tb)
+        return False
 
-        # Cleanup
+    def close(self) -> None:
+        """Gracefully closes the browser."""
+        if self.recycler is None:
+            return
+        try:
+            # A hung close is killed by the watchdog
+            with self.watchdog.deadline(TIMEOUT / 1000):
+                self.recycler.close()
+        except Exception:
+            pass
         finally:
-            try:
-                if browser:
-                    browser.close()
-            except Exception:
-                pass
-            finally:
-                logger.info(BROWSER_CLOSED_MSG)
+            self.recycler = None
+            self.metrics.report(self.logger)
+            self.logger.info(BROWSER_CLOSED_MSG)
+
+    def process(
+        self,
+        credentials: dict[str, str],
+        config: Config | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> PageManager:
+        """Runs one account with the session config or the given one.
+
+        Returns the page manager holding the expiry date and the timings.
+        Pass `timings` to get the timings of a failed account too.
+
+        Raises:
+            DeadlineExceeded: If the run deadline has passed.
+        """
+        if self.recycler is None:
+            raise RuntimeError("Session not started.")
+        self.watchdog.start_run()
+        # Fail before relaunching a browser on a killed driver
+        self.watchdog.remaining()
+        config = config or self.config
+        if config.record_har:
+            # One HAR file per account, each scrubbed with its credentials
+            config = config._replace(
+                record_har=account_path(config.record_har, self.recorded)
+            )
+            self.recorded += 1
+        return run_account(
+            self.recycler.acquire(),
+            credentials,
+            config,
+            self.logger,
+            self.watchdog,
+            self.metrics,
+            self.profiler,
+            timings,
+        )
+
+    def extend(self, credentials: dict[str, str]) -> str:
+        """Extends the expiry date of one account and returns the new date."""
+        config = self.config._replace(peek_only=False, test=False)
+        return self.process(credentials, config).expiry_date
+
+    def peek(self, credentials: dict[str, str]) -> str:
+        """Returns the expiry date of one account without extending it."""
+        config = self.config._replace(peek_only=True, test=False)
+        return self.process(credentials, config).expiry_date
+
+
+def run(
+    credentials: dict[str, str],
+    config: Config,
+    logger: Logger = default_logger,
+    metrics: RunMetrics | None = None,
+) -> None:
+    """Main function to run the application."""
+    with Session(config, logger, metrics) as session:
+        session.process(credentials)
+        if not config.test:
+            logger.info("Done!")
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# har.py
+"""Records and replays the network traffic of a run as a HAR file."""
+
+import json
+from pathlib import Path
+import re
+from typing import Any
+from urllib.parse import quote, quote_plus, unquote_plus
+
+from pythonanywhere_3_months.config import Config
+
+
+# Credentials written to a recorded HAR and typed in when replaying it
+SCRUBBED_CREDENTIALS: dict[str, str] = {
+    'username': 'scrubbed-username',
+    'password': 'scrubbed-password',
+}
+# Login form fields holding the credentials
+CREDENTIAL_FIELDS: dict[str, str] = {
+    'auth-username': 'username',
+    'auth-password': 'password',
+}
+SCRUBBED_HEADER = 'scrubbed'
+# Headers carrying session tokens
+SENSITIVE_HEADERS = {'authorization', 'cookie', 'set-cookie'}
+
+# Fixed seed for anything random in a replayed run
+REPLAY_SEED = 0
+
+
+def context_options(config: Config) -> dict[str, Any]:
+    """Returns the keyword arguments of `Browser.new_context()` to record a
+    HAR file.
+    """
+    if not config.record_har:
+        return {}
+    return {
+        'record_har_path': config.record_har,
+        'record_har_content': 'embed',
+        # Only what is needed to replay
+        'record_har_mode': 'minimal',
+    }
+
+
+def account_path(path: Path, index: int) -> Path:
+    """Returns the HAR file path of the account with the given 0-based index
+    in a run: `run.har`, `run-2.har`, `run-3.har`, ...
+    """
+    if index == 0:
+        return path
+    return path.with_stem(f"{path.stem}-{index + 1}")
+
+
+def scrub(path: Path, credentials: dict[str, str]) -> None:
+    """Replaces the credentials and session headers in a recorded HAR file,
+    so it can be shared and replayed with `SCRUBBED_CREDENTIALS`.
+    """
+    har = json.loads(path.read_text(encoding='utf-8'))
+    for entry in har.get('log', {}).get('entries', []):
+        for message in (entry.get('request', {}), entry.get('response', {})):
+            for header in message.get('headers', []):
+                if header.get('name', '').lower() in SENSITIVE_HEADERS:
+                    header['value'] = SCRUBBED_HEADER
+            message.pop('cookies', None)
+        # By field name, since browsers encode form values differently
+        # from `quote_plus()`
+        post_data = entry.get('request', {}).get('postData', {})
+        for param in post_data.get('params', []):
+            key = CREDENTIAL_FIELDS.get(param.get('name', ''))
+            if key:
+                param['value'] = SCRUBBED_CREDENTIALS[key]
+        if 'text' in post_data:
+            post_data['text'] = scrub_form(post_data['text'])
+
+    # Anywhere else, e.g. the username in URLs
+    text = json.dumps(har, indent=2, ensure_ascii=False)
+    for key, placeholder in SCRUBBED_CREDENTIALS.items():
+        value = credentials.get(key, '')
+        if not value:
+            continue
+        # As typed, in URLs, in form data and escaped in JSON strings
+        forms = {
+            value,
+            quote(value, safe=''),
+            quote_plus(value),
+            json.dumps(value, ensure_ascii=False)[1:-1],
+        }
+        for form in sorted(forms, key=len, reverse=True):
+            text = re.sub(
+                rf"(?<![\w-]){re.escape(form)}(?![\w-])",
+                lambda _: placeholder,
+                text,
+            )
+    path.write_text(text, encoding='utf-8')
+
+
+def scrub_form(text: str) -> str:
+    """Replaces the credential fields of a form-urlencoded body, keeping the
+    other fields exactly as the browser encoded them, so that a replayed
+    request still matches.
+    """
+    pairs: list[str] = []
+    for pair in text.split('&'):
+        name = pair.partition('=')[0]
+        key = CREDENTIAL_FIELDS.get(unquote_plus(name))
+        if key:
+            pair = f"{name}={quote_plus(SCRUBBED_CREDENTIALS[key])}"
+        pairs.append(pair)
+    return '&'.join(pairs)
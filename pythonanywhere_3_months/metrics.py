@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# metrics.py
+"""Counters and timings collected during a run."""
+
+from dataclasses import dataclass, field
+from logging import Logger
+from time import monotonic
+
+from pythonanywhere_3_months.startup import default_logger
+
+
+INPUT_TIME_MSG = "Input time: %.3fs for %d account(s)."
+
+
+@dataclass
+class RunMetrics:
+    """Run metrics.
+
+    Pass an instance to `run()` to read them after the run.
+
+    Attributes:
+        accounts (int): Number of accounts processed
+        recycles (int): Number of browser relaunches by the recycling policy
+        input_time (float): Seconds spent entering credentials
+        launch_time (float): Seconds to start the driver and launch the
+            browser, which overlaps the credentials prompt in the CLI
+        started_at (float): Monotonic start time
+        elapsed (float): Seconds from start to the last report
+    """
+
+    accounts: int = 0
+    recycles: int = 0
+    input_time: float = 0.0
+    launch_time: float = 0.0
+    started_at: float = field(default_factory=monotonic)
+    elapsed: float = 0.0
+
+    def report(self, logger: Logger = default_logger) -> None:
+        """Logs the metrics at DEBUG level, and the input time at INFO level
+        if any credentials were entered.
+        """
+        self.elapsed = monotonic() - self.started_at
+        if self.input_time:
+            logger.info(INPUT_TIME_MSG % (self.input_time, self.accounts))
+        logger.debug(
+            f"Metrics: accounts={self.accounts} recycles={self.recycles} "
+            f"input_time={self.input_time:.3f}s "
+            f"launch_time={self.launch_time:.3f}s elapsed={self.elapsed:.3f}s"
+        )
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# processes.py
+"""Finds, kills and reaps child processes (Playwright driver and browsers)."""
+
+from collections.abc import Iterable
+import os
+import signal
+import subprocess
+import sys
+from time import monotonic, sleep
+
+
+# Seconds to wait for killed children to exit
+REAP_TIMEOUT = 2.0
+# Seconds between checks
+REAP_INTERVAL = 0.02
+
+
+def _process_table() -> dict[int, tuple[int, int]]:
+    """Returns a mapping of pid to (parent pid, RSS in KiB) for all processes.
+
+    Uses `ps`, so it is empty on Windows.
+    """
+    if sys.platform == 'win32':
+        return {}
+    try:
+        out = subprocess.run(
+            ['ps', '-A', '-o', 'pid=,ppid=,rss='],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+    table: dict[int, tuple[int, int]] = {}
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) == 3:
+            table[int(fields[0])] = (int(fields[1]), int(fields[2]))
+    return table
+
+
+def descendants(pid: int | None = None) -> list[int]:
+    """Returns the pids of all descendants of a process (default: this one),
+    parents before children.
+    """
+    root = os.getpid() if pid is None else pid
+    return _descendants(root, _process_table())
+
+
+def children(pid: int | None = None) -> list[int]:
+    """Returns the pids of the direct children of a process (default: this
+    one).
+    """
+    root = os.getpid() if pid is None else pid
+    return [c for c, (p, _) in _process_table().items() if p == root]
+
+
+def _descendants(root: int, table: dict[int, tuple[int, int]]) -> list[int]:
+    found: list[int] = []
+    parents = [root]
+    while parents:
+        children = [c for c, (p, _) in table.items() if p in parents]
+        found.extend(children)
+        parents = children
+    return found
+
+
+def driver_pid(manager: object) -> int | None:
+    """Returns the pid of the driver started by a Playwright context manager,
+    or None if it cannot be found.
+
+    The pid is read from the process of the pipe transport, which is not
+    public API, so it is only returned if it is a child of this process.
+    """
+    connection = getattr(manager, '_connection', None)
+    transport = getattr(connection, '_transport', None)
+    pid = getattr(getattr(transport, '_proc', None), 'pid', None)
+    if not isinstance(pid, int) or pid not in children():
+        return None
+    return pid
+
+
+def rss(roots: Iterable[int]) -> int:
+    """Returns the total resident memory in bytes of all descendants of the
+    given processes, not counting the processes themselves.
+    """
+    table = _process_table()
+    pids = {p for root in roots for p in _descendants(root, table)}
+    return sum(table[p][1] for p in pids) * 1024
+
+
+def kill_tree(pid: int | None = None, include_root: bool = False) -> list[int]:
+    """Kills and reaps all descendants of a process (default: this one),
+    and the process itself if `include_root` is set.
+
+    Returns the pids that were signalled (none on Windows, where the
+    process table is not available).
+    """
+    root = os.getpid() if pid is None else pid
+    pids = descendants(root)
+    if include_root and root != os.getpid() and sys.platform != 'win32':
+        pids.insert(0, root)
+    killed: list[int] = []
+    for p in pids:
+        try:
+            os.kill(p, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            continue
+        killed.append(p)
+    reap(killed)
+    return killed
+
+
+def reap(pids: Iterable[int], timeout: float = REAP_TIMEOUT) -> list[int]:
+    """Waits up to `timeout` seconds for our own killed children to exit and
+    collects their exit status, so no zombies are left. Grandchildren are
+    re-parented and reaped by init.
+
+    Returns the children that have not exited in time.
+    """
+    if sys.platform == 'win32':
+        return []
+    pending = list(pids)
+    deadline = monotonic() + timeout
+    while True:
+        for p in list(pending):
+            try:
+                exited, _ = os.waitpid(p, os.WNOHANG)
+            except ChildProcessError:
+                # Not our child, or already reaped
+                exited = p
+            if exited:
+                pending.remove(p)
+        if not pending or monotonic() >= deadline:
+            return pending
+        sleep(REAP_INTERVAL)
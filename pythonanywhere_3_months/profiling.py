@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# profiling.py
+"""Collects browser performance metrics and a Python profile of a run."""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import cProfile
+import io
+import json
+from logging import Logger
+from pathlib import Path
+from playwright.sync_api import BrowserContext, CDPSession, Page
+import pstats
+from time import monotonic
+from types import TracebackType
+from typing import Any, Self, Literal
+
+from pythonanywhere_3_months.startup import (
+    current_account,
+    current_phase,
+    default_logger,
+)
+
+
+PROFILE_SAVED_MSG = "Saved profile: %s"
+# Number of functions in the Python profile
+PYTHON_STATS_LIMIT = 40
+
+NAVIGATION_TIMING_JS = (
+    "() => performance.getEntriesByType('navigation').map(e => e.toJSON())"
+)
+
+
+class Profiler:
+    """Profiles the Python side with cProfile and samples the browser side
+    before and after each navigation, then writes both to one JSON report.
+
+    Browser metrics from `Performance.getMetrics` need a CDP session, so they
+    are only collected for chromium. Navigation timing is collected for all
+    browsers.
+
+    Does nothing if no report path is given.
+    """
+
+    def __init__(
+        self, path: Path | None = None, logger: Logger = default_logger
+    ) -> None:
+        self.path: Path | None = path
+        self.logger: Logger = logger
+        self.samples: list[dict[str, Any]] = []
+        self.python: cProfile.Profile | None = None
+        self.started_at: float = 0.0
+
+    def __enter__(self) -> Self:
+        if self.path:
+            self.started_at = monotonic()
+            self.python = cProfile.Profile()
+            self.python.enable()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> Literal[False]:
+        if self.python:
+            self.python.disable()
+            self.save()
+        return False
+
+    def attach(self, context: BrowserContext, page: Page) -> CDPSession | None:
+        """Opens a CDP session for a page and enables the metrics, or returns
+        None if not profiling or the browser is not chromium.
+        """
+        if not self.path or context.browser is None:
+            return None
+        if context.browser.browser_type.name != 'chromium':
+            return None
+        cdp = context.new_cdp_session(page)
+        cdp.send('Performance.enable')
+        return cdp
+
+    @contextmanager
+    def around(
+        self, page: Page, cdp: CDPSession | None, label: str
+    ) -> Iterator[None]:
+        """Samples the browser metrics before and after a navigation and
+        records the change, the navigation timing and the duration.
+
+        The sample is recorded even if the navigation fails, but without
+        probing the page again, since it may be hung.
+        """
+        if not self.path:
+            yield
+            return
+
+        sample: dict[str, Any] = {
+            'account': current_account.get(),
+            'phase': current_phase.get(),
+            'label': label,
+            'time': round(monotonic() - self.started_at, 3),
+        }
+        errors: list[str] = []
+        before = self._metrics(cdp, errors)
+        start = monotonic()
+        try:
+            yield
+        except BaseException as e:
+            sample['failed'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            sample['duration'] = round(monotonic() - start, 3)
+            # The probes have no timeout
+            if 'failed' not in sample:
+                after = self._metrics(cdp, errors)
+                if cdp:
+                    sample['metrics'] = {
+                        name: value - before.get(name, 0)
+                        for name, value in after.items()
+                    }
+                sample['navigation'] = self._navigation(page, errors)
+            sample['url'] = page.url
+            if errors:
+                sample['errors'] = errors
+            self.samples.append(sample)
+
+    @staticmethod
+    def _metrics(cdp: CDPSession | None, errors: list[str]) -> dict[str, float]:
+        if not cdp:
+            return {}
+        try:
+            return {
+                m['name']: m['value']
+                for m in cdp.send('Performance.getMetrics')['metrics']
+            }
+        except Exception as e:
+            # Profiling must not fail the run
+            errors.append(f"{type(e).__name__}: {e}")
+            return {}
+
+    @staticmethod
+    def _navigation(page: Page, errors: list[str]) -> dict[str, Any]:
+        try:
+            entries = page.evaluate(NAVIGATION_TIMING_JS)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return {}
+        return entries[-1] if entries else {}
+
+    def save(self) -> None:
+        """Writes the report."""
+        if not self.path:
+            return
+        python = ''
+        if self.python:
+            buf = io.StringIO()
+            stats = pstats.Stats(self.python, stream=buf)
+            stats.sort_stats('cumulative').print_stats(PYTHON_STATS_LIMIT)
+            python = buf.getvalue()
+        report = {
+            'elapsed': round(monotonic() - self.started_at, 3),
+            'samples': self.samples,
+            'python': python,
+        }
+        self.path.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8'
+        )
+        self.logger.info(PROFILE_SAVED_MSG % self.path)
@@ -2,19 +2,52 @@
 # startup.py
 """Logger setter and CLI argument parsers."""
 
-from argparse import ArgumentParser, Namespace, RawTextHelpFormatter
+from argparse import (
+    ArgumentParser,
+    FileType,
+    Namespace,
+    RawTextHelpFormatter,
+)
+import atexit
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import copy
+from datetime import datetime, timezone
+import json
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from queue import SimpleQueue
 import sys
+from time import monotonic
 import yaml
 
-from pythonanywhere_3_months.config import BROWSER_CHOICES
+from pythonanywhere_3_months.config import (
+    ACCOUNT_TIMEOUT,
+    BROWSER_CHOICES,
+    HUMAN_INPUT_DELAY,
+    INPUT_PROFILE,
+    INPUT_PROFILE_CHOICES,
+    RECYCLE_CONTEXTS,
+    RECYCLE_RSS,
+    RECYCLE_UPTIME,
+    RUN_TIMEOUT,
+)
 
 
 # ---------------------------------------------------------------------|
 # Logging
 default_logger: logging.Logger = logging.getLogger()
 
+# The account and phase being processed, added to the JSON log records
+current_account: ContextVar[str | None] = ContextVar(
+    'current_account', default=None
+)
+current_phase: ContextVar[str | None] = ContextVar(
+    'current_phase', default=None
+)
+
 
 class DebugLogFormatter(logging.Formatter):
     """Debug level logging formatter."""
@@ -32,15 +65,110 @@ class DebugLogFormatter(logging.Formatter):
         logging.CRITICAL: logging.Formatter(FMT_ERR),
     }
 
+    DEFAULT_FORMATTER = FORMATTERS[logging.INFO]
+
     def format(self, record: logging.LogRecord) -> str:
-        formatter = self.FORMATTERS.get(
-            record.levelno, logging.Formatter(self.FMT)
-        )
+        formatter = self.FORMATTERS.get(record.levelno, self.DEFAULT_FORMATTER)
         return formatter.format(record)
 
 
-def setup_logger(name: str = '') -> logging.Logger:
-    """Sets and returns a logger."""
+class ContextFilter(logging.Filter):
+    """Tags records with the current account and phase."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, var in (
+            ('account', current_account),
+            ('phase', current_phase),
+        ):
+            if not hasattr(record, key):
+                setattr(record, key, var.get())
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line with the account, phase and duration."""
+
+    FIELDS = ('account', 'phase', 'duration')
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, object] = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for key in self.FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LocalQueueHandler(QueueHandler):
+    """Queue handler for a listener in the same process.
+
+    Only merges the arguments into the message and keeps the exception on the
+    record, so that the listener's formatter gets it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def queue_handler(
+    handler: logging.Handler,
+) -> tuple[QueueHandler, QueueListener]:
+    """Returns a handler that puts records on a queue, and the started
+    listener that writes them out with the given handler from a background
+    thread, so logging never blocks.
+    """
+    queue: SimpleQueue[logging.LogRecord] = SimpleQueue()
+    listener = QueueListener(queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    q_handler = LocalQueueHandler(queue)
+    # Filters run in the logging thread, where the context is set
+    q_handler.addFilter(ContextFilter())
+    return q_handler, listener
+
+
+@contextmanager
+def log_phase(
+    name: str,
+    logger: logging.Logger = default_logger,
+    timings: dict[str, float] | None = None,
+) -> Iterator[None]:
+    """Tags the records logged inside with a phase and logs its duration.
+
+    The duration is also added to `timings` if given.
+    """
+    token = current_phase.set(name)
+    start = monotonic()
+    try:
+        yield
+    finally:
+        duration = monotonic() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + duration
+        logger.debug(
+            f"{name} took {duration:.3f}s",
+            extra={'duration': round(duration, 3)},
+        )
+        current_phase.reset(token)
+
+
+def setup_logger(name: str = '', json_mode: bool = False) -> logging.Logger:
+    """Sets and returns a logger.
+
+    In JSON mode, records are written as JSON lines from a background thread.
+    """
+    handler: logging.Handler
     if name:
         # Level: INFO, use a local logger with a name
         logger = logging.getLogger(name)
@@ -49,6 +177,9 @@ def setup_logger(name: str = '') -> logging.Logger:
         handler.setLevel(logging.INFO)
         formatter = logging.Formatter("[%(levelname)s] %(message)s")
         handler.setFormatter(formatter)
+        if json_mode:
+            handler.setFormatter(JsonLogFormatter())
+            handler, _ = queue_handler(handler)
         logger.addHandler(handler)
         logger.propagate = False
         # Suppress urllib3 warnings
@@ -58,6 +189,9 @@ def setup_logger(name: str = '') -> logging.Logger:
         # Create handler with custom formatter
         handler = logging.StreamHandler(stream=sys.stderr)
         handler.setFormatter(DebugLogFormatter())
+        if json_mode:
+            handler.setFormatter(JsonLogFormatter())
+            handler, _ = queue_handler(handler)
         logging.basicConfig(
             level=logging.DEBUG,
             # format="%(asctime)s %(levelno)s - %(message)s",
@@ -99,6 +233,106 @@ def get_args_and_logger() -> tuple[Namespace, logging.Logger]:
             "(https://playwright.dev/python/docs/browsers#chromium-headless-shell)"
         ),
     )
+    parser.add_argument(
+        '--account-timeout',
+        metavar='sec',
+        type=float,
+        default=ACCOUNT_TIMEOUT,
+        help=(
+            "Deadline in seconds for each account, 0 for none\n"
+            "(default: %(default)g or from $ACCOUNT_TIMEOUT)"
+        ),
+    )
+    parser.add_argument(
+        '--run-timeout',
+        metavar='sec',
+        type=float,
+        default=RUN_TIMEOUT,
+        help=(
+            "Deadline in seconds for the whole run, 0 for none\n"
+            "(default: %(default)g or from $RUN_TIMEOUT)"
+        ),
+    )
+    parser.add_argument(
+        '--recycle-contexts',
+        metavar='int',
+        type=int,
+        default=RECYCLE_CONTEXTS,
+        help=(
+            "Relaunch the browser after this many accounts, 0 for never\n"
+            "(default: %(default)s or from $RECYCLE_CONTEXTS)"
+        ),
+    )
+    parser.add_argument(
+        '--recycle-uptime',
+        metavar='sec',
+        type=float,
+        default=RECYCLE_UPTIME,
+        help=(
+            "Relaunch the browser after this many seconds, 0 for never\n"
+            "(default: %(default)g or from $RECYCLE_UPTIME)"
+        ),
+    )
+    parser.add_argument(
+        '--recycle-rss',
+        metavar='MiB',
+        type=int,
+        default=RECYCLE_RSS,
+        help=(
+            "Relaunch the browser when it uses more memory than this, "
+            "0 for never\n"
+            "(default: %(default)s or from $RECYCLE_RSS)"
+        ),
+    )
+    parser.add_argument(
+        '--input',
+        metavar='str',
+        choices=INPUT_PROFILE_CHOICES,
+        default=INPUT_PROFILE,
+        help=(
+            "How to enter the credentials: 'instant' fills the fields,\n"
+            "'human' types with a random delay of %g-%gms per key,\n"
+            "'custom' types with the delay of --input-delay\n"
+            "(default: %%(default)s or from $INPUT_PROFILE)"
+        )
+        % HUMAN_INPUT_DELAY,
+    )
+    parser.add_argument(
+        '--input-delay',
+        metavar=('min', 'max'),
+        nargs=2,
+        type=float,
+        default=HUMAN_INPUT_DELAY,
+        help=(
+            "Per-key delay range in milliseconds for '--input custom'\n"
+            "(default: %g %g)" % HUMAN_INPUT_DELAY
+        ),
+    )
+    har_group = parser.add_mutually_exclusive_group()
+    har_group.add_argument(
+        '--record-har',
+        metavar='path',
+        type=Path,
+        help="Record the network traffic to a HAR file (credentials scrubbed)",
+    )
+    har_group.add_argument(
+        '--replay-har',
+        metavar='path',
+        type=Path,
+        help=(
+            "Serve the network traffic from a recorded HAR file\n"
+            "(offline, no credentials needed)"
+        ),
+    )
+    parser.add_argument(
+        '--accounts',
+        metavar='path',
+        type=FileType('r', encoding='utf-8'),
+        help=(
+            "Read accounts as JSON lines from a file ('-' for stdin) and\n"
+            "write one JSON line result per account to stdout"
+        ),
+    )
     parser.add_argument(
         '--peek',
         action='store_true',
@@ -115,6 +349,23 @@ def get_args_and_logger() -> tuple[Namespace, logging.Logger]:
             "(default to false or from $DEBUG_MODE)"
         ),
     )
+    parser.add_argument(
+        '--log-json',
+        action='store_true',
+        help=(
+            "Write logs as JSON lines tagged with the account, phase and "
+            "duration (default: false)"
+        ),
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='path',
+        type=Path,
+        help=(
+            "Write a JSON report of browser performance metrics (chromium)\n"
+            "and navigation timing around each navigation, and a Python profile"
+        ),
+    )
     parser.add_argument(
         '--test',
         action='store_true',
@@ -125,12 +376,24 @@ def get_args_and_logger() -> tuple[Namespace, logging.Logger]:
     )
     args = parser.parse_args()
 
-    logger = setup_logger('' if args.debug else __name__)
+    logger = setup_logger('' if args.debug else __name__, args.log_json)
     logger.debug(f"Args:\n{vars(args)}")
 
     return args, logger
 
 
+def is_valid_credentials(credentials: object) -> bool:
+    """Checks if the credentials have a non-empty username and password."""
+    return (
+        bool(credentials)
+        and isinstance(credentials, dict)
+        and all(
+            k in credentials and credentials[k]
+            for k in ['username', 'password']
+        )
+    )
+
+
 def get_credentials(
     credentials_path: Path,
     logger: logging.Logger = default_logger,
@@ -163,14 +426,7 @@ def get_credentials(
         credentials['password'] = getpass("Password: ").strip()
 
     # Check and return
-    if (
-        credentials
-        and isinstance(credentials, dict)
-        and all(
-            k in credentials and credentials[k]
-            for k in ['username', 'password']
-        )
-    ):
+    if is_valid_credentials(credentials):
         if not file_exists:
             credentials_path.parent.mkdir(parents=True, exist_ok=True)
             credentials_path.write_text(
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# stream.py
+"""Reads accounts and writes results as JSON lines, one account at a time."""
+
+from collections.abc import Iterable, Iterator
+import json
+from logging import Logger
+import sys
+from typing import Any, TextIO
+
+from pythonanywhere_3_months.config import Config
+from pythonanywhere_3_months.core import Session
+from pythonanywhere_3_months.metrics import RunMetrics
+from pythonanywhere_3_months.startup import default_logger, is_valid_credentials
+
+
+def read_lines(stream: TextIO) -> Iterator[str]:
+    """Yields the non-empty lines of a stream as soon as each one arrives."""
+    for line in iter(stream.readline, ''):
+        line = line.strip()
+        if line:
+            yield line
+
+
+def write_result(out: TextIO, result: dict[str, Any]) -> None:
+    """Writes one result as a JSON line and flushes it."""
+    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def run_stream(
+    lines: Iterable[str],
+    config: Config,
+    logger: Logger = default_logger,
+    out: TextIO = sys.stdout,
+    metrics: RunMetrics | None = None,
+) -> int:
+    """Processes accounts given as JSON lines with a username and password.
+
+    Each account is processed as soon as its line is read, and its result is
+    written to `out` as soon as it finishes. A failed account does not stop
+    the batch.
+
+    Returns the number of failed accounts.
+    """
+    failures = 0
+    with Session(config, logger, metrics) as session:
+        for line in lines:
+            result = process_line(line, session, config)
+            if result['outcome'] == 'failed':
+                failures += 1
+            write_result(out, result)
+    return failures
+
+
+def process_line(
+    line: str, session: Session, config: Config
+) -> dict[str, Any]:
+    """Processes the account of one JSON line and returns its result."""
+    result: dict[str, Any] = {
+        'username': None,
+        'outcome': 'failed',
+        'expiry_date': None,
+        'error': None,
+        'timings': {},
+    }
+    try:
+        credentials = json.loads(line)
+    except json.JSONDecodeError as e:
+        result['error'] = f"Invalid JSON: {e}"
+        return result
+    if isinstance(credentials, dict):
+        result['username'] = credentials.get('username')
+    if not is_valid_credentials(credentials):
+        result['error'] = "Invalid PythonAnywhere credentials."
+        return result
+
+    timings: dict[str, float] = {}
+    try:
+        pm = session.process(credentials, timings=timings)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        result['timings'] = {k: round(v, 3) for k, v in timings.items()}
+
+    if config.test:
+        result['outcome'] = 'tested'
+    elif config.peek_only:
+        result['outcome'] = 'peeked'
+    else:
+        result['outcome'] = 'extended'
+    result['expiry_date'] = pm.expiry_date or None
+    return result
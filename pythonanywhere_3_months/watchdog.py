@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# watchdog.py
+"""Wall-clock deadlines for each account and for the whole run."""
+
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from logging import Logger
+from playwright.sync_api import TimeoutError
+import threading
+from time import monotonic
+from types import TracebackType
+from typing import Self, Literal
+
+from pythonanywhere_3_months.processes import children, kill_tree
+from pythonanywhere_3_months.startup import default_logger
+
+
+# Seconds past a deadline before hung processes are killed
+GRACE_PERIOD = 5.0
+# Seconds between checks
+POLL_INTERVAL = 0.5
+
+ACCOUNT_DEADLINE_MSG = "Deadline of %gs exceeded."
+RUN_DEADLINE_MSG = "Run deadline of %gs exceeded."
+KILLED_MSG = "Killed hung child processes: %s"
+OVERDUE_MSG = "Deadline exceeded by more than %gs, killing the %s."
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an account or the whole run is past its deadline."""
+
+
+class Watchdog:
+    """Keeps the deadlines and kills hung browsers when the Playwright
+    timeouts alone cannot unblock the run (e.g. a hung `browser.close()`).
+
+    Deadlines are enforced cooperatively: `remaining()` shortens the
+    Playwright timeouts so that a blocked call fails in time. If an account is
+    still blocked `GRACE_PERIOD` seconds later, the watchdog thread kills the
+    browsers under the tracked Playwright drivers, which makes the blocked
+    call fail. The drivers stay alive, so a browser can be relaunched for the
+    next account. If the whole run is overdue while a step is running, the
+    drivers are killed too. Nothing is killed while idle, e.g. between
+    accounts.
+
+    Only the processes of the drivers given to `track()` are ever killed.
+
+    The run deadline starts with `start_run()`, so that e.g. waiting for the
+    user to enter credentials does not count. A timeout of 0 disables the
+    deadline.
+    """
+
+    def __init__(
+        self,
+        account_timeout: float = 0,
+        run_timeout: float = 0,
+        logger: Logger = default_logger,
+    ) -> None:
+        self.account_timeout: float = account_timeout
+        self.run_timeout: float = run_timeout
+        self.logger: Logger = logger
+        self.run_deadline: float | None = None
+        self.account_deadline: float | None = None
+        self.killed: list[int] = []
+        self._limit: float = account_timeout
+        # Number of steps running under `deadline()`
+        self._busy: int = 0
+        self.drivers: set[int] = set()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Self:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="watchdog", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> Literal[False]:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        # After a failure, do not leave the drivers behind
+        if exc_type is not None:
+            self.kill()
+        return False
+
+    def track(self, pids: Iterable[int]) -> None:
+        """Adds the pids of Playwright drivers started for this run."""
+        self.drivers.update(pids)
+
+    def start_run(self) -> None:
+        """Starts the run deadline, if not started yet."""
+        if self.run_timeout > 0 and self.run_deadline is None:
+            self.run_deadline = monotonic() + self.run_timeout
+
+    def account(self) -> AbstractContextManager[None]:
+        """Starts the deadline of one account."""
+        return self.deadline(self.account_timeout)
+
+    @contextmanager
+    def deadline(self, timeout: float) -> Iterator[None]:
+        """Starts a deadline for one step, replacing the account deadline."""
+        if timeout > 0:
+            self.account_deadline = monotonic() + timeout
+            self._limit = timeout
+        self._busy += 1
+        try:
+            yield
+        finally:
+            self._busy -= 1
+            self.account_deadline = None
+
+    def remaining(self) -> float | None:
+        """Returns the seconds left before the nearest deadline, or None if
+        there is no deadline.
+
+        Raises:
+            DeadlineExceeded: If a deadline has passed.
+        """
+        now = monotonic()
+        remaining: float | None = None
+        for deadline, timeout, template in (
+            (self.account_deadline, self._limit, ACCOUNT_DEADLINE_MSG),
+            (self.run_deadline, self.run_timeout, RUN_DEADLINE_MSG),
+        ):
+            if deadline is None:
+                continue
+            if now >= deadline:
+                raise DeadlineExceeded(template % timeout)
+            if remaining is None or deadline - now < remaining:
+                remaining = deadline - now
+        return remaining
+
+    def kill_browsers(self) -> list[int]:
+        """Kills and reaps the browsers of the tracked drivers, keeping the
+        drivers alive.
+        """
+        killed: list[int] = []
+        for driver in self._alive():
+            killed.extend(kill_tree(driver))
+        self._killed(killed)
+        return killed
+
+    def kill(self) -> list[int]:
+        """Kills and reaps the tracked drivers and their browsers."""
+        killed: list[int] = []
+        for driver in self._alive():
+            killed.extend(kill_tree(driver, include_root=True))
+        self.drivers.clear()
+        self._killed(killed)
+        return killed
+
+    def _alive(self) -> list[int]:
+        # A driver that is no longer our child has been reaped, and its pid
+        # may have been reused
+        return [p for p in children() if p in self.drivers]
+
+    def _killed(self, pids: list[int]) -> None:
+        if pids:
+            self.logger.debug(KILLED_MSG % pids)
+            self.killed.extend(pids)
+
+    @staticmethod
+    def _overdue(deadline: float | None, now: float) -> bool:
+        return deadline is not None and now >= deadline + GRACE_PERIOD
+
+    def _watch(self) -> None:
+        while not self._stop.wait(POLL_INTERVAL):
+            now = monotonic()
+            if self._busy and self._overdue(self.run_deadline, now):
+                self.logger.error(OVERDUE_MSG % (GRACE_PERIOD, "driver"))
+                self.kill()
+                return
+            if self._overdue(self.account_deadline, now):
+                self.logger.error(OVERDUE_MSG % (GRACE_PERIOD, "browser"))
+                self.kill_browsers()
+                self.account_deadline = None
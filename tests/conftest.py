@@ -3,6 +3,8 @@
 import platform
 import pytest
 
+from pythonanywhere_3_months.config import Config
+
 
 @pytest.fixture(scope="session")
 def browser_type_launch_args(browser_type_launch_args):
@@ -17,3 +19,23 @@ def browser_type_launch_args(browser_type_launch_args):
             **browser_type_launch_args,
             'channel': 'chromium',
         }
+
+
+@pytest.fixture
+def make_config():
+    """Returns a function building a config that peeks with chromium headless
+    shell, with any field overridden.
+    """
+
+    def make_config(**kwargs):
+        config = Config(
+            peek_only=True,
+            debug=False,
+            test=False,
+            headed_mode=False,
+            browser_name='chromium',
+            headless_shell=True,
+        )
+        return config._replace(**kwargs)
+
+    return make_config
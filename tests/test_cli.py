@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# tests/test_cli.py
+from argparse import Namespace
+from concurrent.futures import CancelledError
+import logging
+
+import pytest
+
+from pythonanywhere_3_months import cli
+
+
+@pytest.fixture
+def events(monkeypatch, make_config):
+    """Runs `main()` with a fake run that records what happens to the
+    credentials it waits for.
+    """
+    events = []
+    logger = logging.getLogger('test_cli')
+
+    def run_when_loaded(credentials, config, logger):
+        events.append('launched')
+        try:
+            events.append(credentials.result())
+        except CancelledError:
+            events.append('closed')
+            raise
+
+    monkeypatch.setattr(
+        cli, 'get_args_and_logger', lambda: (Namespace(accounts=None), logger)
+    )
+    monkeypatch.setattr(cli, 'load_config', lambda args: make_config())
+    monkeypatch.setattr(cli, 'run_when_loaded', run_when_loaded)
+    return events
+
+
+def test_main(monkeypatch, events):
+    """Tests passing the loaded credentials to the early-started run."""
+    credentials = {'username': 'alice', 'password': 'secret'}
+    monkeypatch.setattr(
+        cli, 'get_credentials', lambda path, logger: credentials
+    )
+    cli.main()
+    assert events == ['launched', credentials]
+
+
+@pytest.mark.parametrize(
+    'error, code',
+    [(ValueError("Invalid credentials."), 1), (KeyboardInterrupt, 130)],
+)
+def test_main_cancelled(monkeypatch, events, error, code):
+    """Tests that failing to load the credentials cancels the run and waits
+    for the early-launched browser to close.
+    """
+
+    def get_credentials(path, logger):
+        raise error
+
+    monkeypatch.setattr(cli, 'get_credentials', get_credentials)
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main()
+    assert exc_info.value.code == code
+    assert events == ['launched', 'closed']
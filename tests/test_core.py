@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# tests/test_core.py
+from argparse import Namespace
+import subprocess
+import sys
+from time import monotonic
+
+from playwright.sync_api import sync_playwright
+import pytest
+
+from pythonanywhere_3_months import core
+from pythonanywhere_3_months.browsers import BrowserRecycler
+from pythonanywhere_3_months.config import HUMAN_INPUT_DELAY, load_config
+from pythonanywhere_3_months.core import PageManager, Session
+from pythonanywhere_3_months.watchdog import DeadlineExceeded
+
+
+class FakePage:
+    def __init__(self):
+        self.calls = []
+
+    def fill(self, selector, text):
+        self.calls.append(('fill', selector, text, None))
+
+    def type(self, selector, text, delay):
+        self.calls.append(('type', selector, text, delay))
+
+
+def enter_text(config):
+    pm = PageManager(None, {}, '', '', config)
+    pm.page = FakePage()
+    pm.enter_text('#field', 'text')
+    return pm.page.calls
+
+
+def test_enter_text_profiles(make_config):
+    """Tests selecting how to enter text by the input profile."""
+    assert enter_text(make_config(input_profile='instant')) == [
+        ('fill', '#field', 'text', None)
+    ]
+
+    [(method, _, _, delay)] = enter_text(make_config(input_profile='human'))
+    assert method == 'type'
+    assert HUMAN_INPUT_DELAY[0] <= delay <= HUMAN_INPUT_DELAY[1]
+
+    calls = enter_text(
+        make_config(input_profile='custom', input_delay=(5.0, 5.0))
+    )
+    assert calls == [('type', '#field', 'text', 5.0)]
+
+    with pytest.raises(ValueError):
+        enter_text(make_config(input_profile='fast'))
+
+
+def make_args(**kwargs):
+    args = {
+        'peek': True,
+        'debug': False,
+        'test': False,
+        'headed': False,
+        'browser': 'chromium',
+        'shell': True,
+        'account_timeout': 0,
+        'run_timeout': 0,
+        'record_har': None,
+        'replay_har': None,
+        'recycle_contexts': 0,
+        'recycle_uptime': 0,
+        'recycle_rss': 0,
+        'input': 'human',
+        'input_delay': [50.0, 100.0],
+        'profile': None,
+    }
+    args.update(kwargs)
+    return Namespace(**args)
+
+
+def test_load_config_input():
+    """Tests validating the input profile and delay."""
+    config = load_config(make_args(input='custom', input_delay=[0.0, 10.0]))
+    assert config.input_profile == 'custom'
+    assert config.input_delay == (0.0, 10.0)
+
+    with pytest.raises(ValueError, match="profile"):
+        load_config(make_args(input='fast'))
+    with pytest.raises(ValueError, match="delay"):
+        load_config(make_args(input_delay=[-1.0, 10.0]))
+    with pytest.raises(ValueError, match="delay"):
+        load_config(make_args(input_delay=[20.0, 10.0]))
+
+
+def test_session_overrides(monkeypatch, make_config):
+    """Tests that extend() and peek() override the session config."""
+    configs = []
+
+    def process(self, credentials, config=None, timings=None):
+        configs.append(config)
+        pm = PageManager(None, credentials, '', '', config)
+        pm.expiry_date = 'date'
+        return pm
+
+    monkeypatch.setattr(Session, 'process', process)
+    session = Session(make_config(test=True))
+    credentials = {'username': 'alice', 'password': 'secret'}
+
+    assert session.extend(credentials) == 'date'
+    assert session.peek(credentials) == 'date'
+    extend, peek = configs
+    assert not extend.peek_only and not extend.test
+    assert peek.peek_only and not peek.test
+    # The session config is unchanged
+    assert session.config.test and session.config.peek_only
+
+
+def test_session_not_started(make_config):
+    """Tests processing an account before entering the session."""
+    session = Session(make_config())
+    with pytest.raises(RuntimeError, match="not started"):
+        session.peek({'username': 'alice', 'password': 'secret'})
+
+
+def test_session_past_run_deadline(make_config):
+    """Tests that no browser is acquired once the run deadline has passed."""
+
+    class Recycler:
+        def acquire(self):
+            pytest.fail("acquired")
+
+    session = Session(make_config(run_timeout=1))
+    session.recycler = Recycler()
+    session.watchdog.run_deadline = monotonic() - 1
+    with pytest.raises(DeadlineExceeded, match="Run deadline"):
+        session.peek({'username': 'alice', 'password': 'secret'})
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="needs ps")
+def test_session_tracks_driver(monkeypatch, make_config):
+    """Tests that only the Playwright driver is tracked, not a `ps` call or a
+    sibling subprocess started meanwhile.
+    """
+    managers = []
+    siblings = []
+
+    def start_playwright():
+        siblings.append(subprocess.Popen(['sleep', '100']))
+        managers.append(sync_playwright())
+        return managers[-1]
+
+    monkeypatch.setattr(core, 'sync_playwright', start_playwright)
+    monkeypatch.setattr(BrowserRecycler, 'launch', lambda self: None)
+    try:
+        with Session(make_config()) as session:
+            driver = managers[0]._connection._transport._proc.pid
+            assert session.watchdog.drivers == {driver}
+    finally:
+        for p in siblings:
+            p.kill()
+            p.wait()
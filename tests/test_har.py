@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# tests/test_har.py
+import json
+
+from pythonanywhere_3_months.har import (
+    SCRUBBED_CREDENTIALS,
+    SCRUBBED_HEADER,
+    account_path,
+    scrub,
+    scrub_form,
+)
+
+
+def test_scrub(tmp_path):
+    """Tests removing credentials and session headers from a HAR file."""
+    credentials = {'username': 'alice', 'password': 'p@ss word'}
+    har = {
+        'log': {
+            'entries': [
+                {
+                    'request': {
+                        'method': 'POST',
+                        'url': 'https://www.pythonanywhere.com/login/',
+                        'headers': [{'name': 'Cookie', 'value': 'sessionid=1'}],
+                        'postData': {
+                            'text': 'auth-username=alice&auth-password=p%40ss+word'
+                        },
+                    },
+                    'response': {
+                        'headers': [
+                            {'name': 'Location', 'value': '/user/alice/'},
+                            {'name': 'Set-Cookie', 'value': 'sessionid=2'},
+                        ],
+                        'content': {'text': '<p>alice</p><p>malice</p>'},
+                    },
+                }
+            ]
+        }
+    }
+    path = tmp_path / 'run.har'
+    path.write_text(json.dumps(har), encoding='utf-8')
+
+    scrub(path, credentials)
+
+    text = path.read_text(encoding='utf-8')
+    entry = json.loads(text)['log']['entries'][0]
+    username = SCRUBBED_CREDENTIALS['username']
+    password = SCRUBBED_CREDENTIALS['password']
+    assert 'p@ss' not in text and 'p%40ss' not in text
+    assert entry['request']['postData']['text'] == (
+        f"auth-username={username}&auth-password={password}"
+    )
+    assert entry['request']['headers'][0]['value'] == SCRUBBED_HEADER
+    assert entry['response']['headers'][0]['value'] == f"/user/{username}/"
+    assert entry['response']['headers'][1]['value'] == SCRUBBED_HEADER
+    # Only whole words are replaced
+    assert entry['response']['content']['text'] == (
+        f"<p>{username}</p><p>malice</p>"
+    )
+
+
+def test_scrub_form_encoding(tmp_path):
+    """Tests scrubbing credentials as browsers encode them, which differs from
+    `quote_plus()` for `~` and `*`.
+    """
+    username = SCRUBBED_CREDENTIALS['username']
+    password = SCRUBBED_CREDENTIALS['password']
+    text = (
+        "csrfmiddlewaretoken=t%2Fk&auth-username=bob%7E1"
+        "&auth-password=a*b+c%7Ed&next=%2F"
+    )
+    assert scrub_form(text) == (
+        f"csrfmiddlewaretoken=t%2Fk&auth-username={username}"
+        f"&auth-password={password}&next=%2F"
+    )
+
+    har = {
+        'log': {
+            'entries': [
+                {
+                    'request': {
+                        'postData': {
+                            'mimeType': 'application/x-www-form-urlencoded',
+                            'text': text,
+                            'params': [
+                                {'name': 'auth-username', 'value': 'bob~1'},
+                                {'name': 'auth-password', 'value': 'a*b c~d'},
+                            ],
+                        },
+                    },
+                }
+            ]
+        }
+    }
+    path = tmp_path / 'run.har'
+    path.write_text(json.dumps(har), encoding='utf-8')
+
+    scrub(path, {'username': 'bob~1', 'password': 'a*b c~d'})
+
+    text = path.read_text(encoding='utf-8')
+    assert 'bob' not in text and 'a*b' not in text
+    params = json.loads(text)['log']['entries'][0]['request']['postData'][
+        'params'
+    ]
+    assert [p['value'] for p in params] == [username, password]
+
+
+def test_account_path(tmp_path):
+    """Tests one HAR file per account."""
+    path = tmp_path / 'run.har'
+    assert account_path(path, 0) == path
+    assert account_path(path, 1) == tmp_path / 'run-2.har'
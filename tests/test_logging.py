@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# tests/test_logging.py
+import atexit
+import io
+import json
+import logging
+
+from pythonanywhere_3_months.startup import (
+    JsonLogFormatter,
+    current_account,
+    log_phase,
+    queue_handler,
+)
+
+
+def test_json_log_formatter():
+    """Tests formatting a record as a JSON line."""
+    record = logging.LogRecord(
+        'test', logging.INFO, __file__, 1, "took %ss", (1.5,), None
+    )
+    record.account = 'alice'
+    record.duration = 1.5
+    entry = json.loads(JsonLogFormatter().format(record))
+    assert entry['level'] == 'INFO'
+    assert entry['message'] == "took 1.5s"
+    assert entry['account'] == 'alice'
+    assert entry['duration'] == 1.5
+    assert 'phase' not in entry
+
+
+def test_queue_handler():
+    """Tests writing tagged JSON lines through the queue."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLogFormatter())
+    q_handler, listener = queue_handler(handler)
+    # As set up by `setup_logger('', json_mode=True)`
+    logging.basicConfig(handlers=[q_handler], force=True)
+    logger = logging.getLogger('test_queue_handler')
+    logger.setLevel(logging.DEBUG)
+    try:
+        token = current_account.set('alice')
+        with log_phase('log_in', logger):
+            logger.error("real %s", "message")
+        current_account.reset(token)
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        listener.stop()
+        atexit.unregister(listener.stop)
+        logging.getLogger().removeHandler(q_handler)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entries[0]['message'] == "real message"
+    assert entries[0]['account'] == 'alice'
+    assert entries[0]['phase'] == 'log_in'
+    assert entries[1]['phase'] == 'log_in'
+    assert entries[1]['duration'] >= 0
+    # The exception stays out of the message
+    assert entries[2]['message'] == "failed"
+    assert entries[2]['exc_info'].endswith("ValueError: bad")
+    assert 'exc_info' not in entries[0]
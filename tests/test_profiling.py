@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# tests/test_profiling.py
+import json
+
+import pytest
+
+from pythonanywhere_3_months.profiling import Profiler
+
+
+class FakeCDPSession:
+    def __init__(self):
+        self.script_duration = 0.0
+
+    def send(self, method):
+        assert method == 'Performance.getMetrics'
+        return {
+            'metrics': [
+                {'name': 'ScriptDuration', 'value': self.script_duration},
+                {'name': 'Nodes', 'value': 10},
+            ]
+        }
+
+
+class FakePage:
+    url = 'https://www.pythonanywhere.com/login/'
+    hung = False
+
+    def evaluate(self, js):
+        assert not self.hung
+        return [{'name': self.url, 'domContentLoadedEventEnd': 12.5}]
+
+
+def test_sample_around(tmp_path):
+    """Tests recording the change of the metrics around navigations and
+    saving the report.
+    """
+    path = tmp_path / 'profile.json'
+    page = FakePage()
+    cdp = FakeCDPSession()
+
+    with Profiler(path) as profiler:
+        with profiler.around(page, cdp, 'goto_page'):
+            cdp.script_duration = 0.25
+        with pytest.raises(TimeoutError):
+            with profiler.around(page, cdp, 'expect_navigation'):
+                # Neither the page nor CDP is probed after a failure
+                page.hung = True
+                cdp.send = None
+                raise TimeoutError("Timeout logging in after 30s.")
+
+    report = json.loads(path.read_text(encoding='utf-8'))
+    first, second = report['samples']
+    assert first['label'] == 'goto_page'
+    assert first['metrics'] == {'ScriptDuration': 0.25, 'Nodes': 0}
+    assert first['navigation']['domContentLoadedEventEnd'] == 12.5
+    assert 'failed' not in first
+    # Failed navigations are sampled too, without probes
+    assert second['label'] == 'expect_navigation'
+    assert second['failed'] == "TimeoutError: Timeout logging in after 30s."
+    assert 'metrics' not in second and 'navigation' not in second
+    assert 'errors' not in second
+    assert report['elapsed'] >= 0
+    assert 'function calls' in report['python']
+
+
+def test_disabled(tmp_path):
+    """Tests that nothing is recorded without a report path."""
+    with Profiler() as profiler:
+        with profiler.around(FakePage(), FakeCDPSession(), 'goto_page'):
+            pass
+    assert profiler.samples == []
+    assert list(tmp_path.iterdir()) == []
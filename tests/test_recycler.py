@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# tests/test_recycler.py
+from time import monotonic
+from types import SimpleNamespace
+
+import pytest
+
+from pythonanywhere_3_months import browsers
+from pythonanywhere_3_months.browsers import BrowserRecycler
+
+
+@pytest.fixture
+def make_recycler(make_config):
+    def make_recycler(**kwargs):
+        recycler = BrowserRecycler(None, make_config(**kwargs))
+        recycler.launched_at = monotonic()
+        return recycler
+
+    return make_recycler
+
+
+def test_recycle_after_contexts(make_recycler):
+    """Tests recycling after a number of contexts."""
+    recycler = make_recycler(
+        recycle_contexts=2, recycle_uptime=0, recycle_rss=0
+    )
+    recycler.contexts = 1
+    assert recycler.recycle_reason() == ''
+    recycler.contexts = 2
+    assert recycler.recycle_reason() == "2 contexts"
+
+
+def test_recycle_after_uptime(make_recycler):
+    """Tests recycling after an uptime."""
+    recycler = make_recycler(
+        recycle_contexts=0, recycle_uptime=60, recycle_rss=0
+    )
+    assert recycler.recycle_reason() == ''
+    recycler.launched_at -= 61
+    assert recycler.recycle_reason().startswith("uptime")
+
+
+def test_recycle_over_rss(monkeypatch, make_recycler):
+    """Tests recycling when the memory passes the threshold."""
+    recycler = make_recycler(
+        recycle_contexts=0, recycle_uptime=0, recycle_rss=100
+    )
+    recycler.watchdog.track([42])
+    roots = []
+
+    def fake_rss(mib):
+        def rss(pids):
+            roots.append(set(pids))
+            return mib * 2**20
+
+        return rss
+
+    monkeypatch.setattr(browsers, 'rss', fake_rss(99))
+    assert recycler.recycle_reason() == ''
+    monkeypatch.setattr(browsers, 'rss', fake_rss(100))
+    assert recycler.recycle_reason() == "RSS 100 MiB"
+    # Only the memory under the tracked drivers
+    assert roots == [{42}, {42}]
+
+
+def test_relaunch_never_installs(monkeypatch, make_recycler):
+    """Tests that only the first launch may install the browser."""
+    installs = []
+
+    def get_browser(p, config, logger, before_install, install):
+        installs.append(install)
+        return object()
+
+    monkeypatch.setattr(browsers, 'get_browser', get_browser)
+    recycler = make_recycler()
+    recycler.launch()
+    recycler.browser = None
+    recycler.launch()
+    assert installs == [True, False]
+
+
+def test_failed_launch_without_install(monkeypatch, make_recycler):
+    """Tests that a failed launch raises instead of installing."""
+
+    def launch(**kwargs):
+        raise RuntimeError("driver closed")
+
+    def install(*args, **kwargs):
+        pytest.fail("installed")
+
+    monkeypatch.setattr(browsers.subprocess, 'run', install)
+    recycler = make_recycler()
+    p = SimpleNamespace(chromium=SimpleNamespace(launch=launch))
+    with pytest.raises(RuntimeError):
+        browsers.get_browser(p, recycler.config, install=False)
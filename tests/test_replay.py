@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# tests/test_replay.py
+import json
+import logging
+import platform
+
+from pythonanywhere_3_months import run
+from pythonanywhere_3_months.config import LOGIN_PAGE_URL
+from pythonanywhere_3_months.core import CURRENT_DATE_TEMPLATE, PEEK_MSG
+from pythonanywhere_3_months.har import scrub
+
+ORIGIN = LOGIN_PAGE_URL.split('/login/')[0]
+EXPIRY_DATE = "Tuesday 19 January 2027"
+HTML = [{'name': 'Content-Type', 'value': 'text/html; charset=utf-8'}]
+
+
+def entry(method, url, status=200, html='', headers=(), post_data=None):
+    request = {'method': method, 'url': url, 'headers': []}
+    if post_data is not None:
+        request['postData'] = {
+            'mimeType': 'application/x-www-form-urlencoded',
+            'text': post_data,
+        }
+    return {
+        'request': request,
+        'response': {
+            'status': status,
+            'headers': HTML + list(headers),
+            'content': {'mimeType': 'text/html', 'text': html},
+        },
+    }
+
+
+def test_replay_scrubbed_har(tmp_path, caplog, make_config):
+    """Tests that a scrubbed HAR file replays offline (chromium)."""
+    credentials = {'username': 'alice', 'password': 's3cret!'}
+    har = {
+        'log': {
+            'version': '1.2',
+            'entries': [
+                entry(
+                    'GET',
+                    LOGIN_PAGE_URL,
+                    html=(
+                        '<form method="post" action="/login/">'
+                        '<input id="id_auth-username" name="auth-username">'
+                        '<input id="id_auth-password" name="auth-password"'
+                        ' type="password">'
+                        '<button id="id_next" type="submit">Log in</button>'
+                        '</form>'
+                    ),
+                ),
+                entry(
+                    'POST',
+                    LOGIN_PAGE_URL,
+                    status=302,
+                    headers=[
+                        {'name': 'Location', 'value': '/user/alice/'},
+                        {'name': 'Set-Cookie', 'value': 'sessionid=1'},
+                    ],
+                    post_data='auth-username=alice&auth-password=s3cret%21',
+                ),
+                entry(
+                    'GET',
+                    f"{ORIGIN}/user/alice/",
+                    html=(
+                        '<button class="logout_link" type="submit">'
+                        'Log out</button>'
+                    ),
+                ),
+                entry(
+                    'GET',
+                    f"{ORIGIN}/user/alice/webapps",
+                    html=(
+                        '<p class="webapp_expiry">Expires on '
+                        f'<strong>{EXPIRY_DATE}</strong></p>'
+                        '<button class="logout_link" type="submit">'
+                        'Log out</button>'
+                    ),
+                ),
+            ],
+        }
+    }
+    path = tmp_path / 'run.har'
+    path.write_text(json.dumps(har), encoding='utf-8')
+    scrub(path, credentials)
+    assert 'alice' not in path.read_text(encoding='utf-8')
+
+    config = make_config(
+        headless_shell=platform.system() == 'Linux',
+        replay_har=path,
+        input_profile='instant',
+    )
+    with caplog.at_level(logging.INFO):
+        run({}, config)
+        messages = [r.message for r in caplog.records]
+        assert PEEK_MSG in messages
+        assert CURRENT_DATE_TEMPLATE % EXPIRY_DATE in messages
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# tests/test_stream.py
+import io
+import json
+
+from pythonanywhere_3_months import stream
+from pythonanywhere_3_months.core import PageManager
+from pythonanywhere_3_months.stream import process_line, read_lines, run_stream
+
+
+def test_read_lines():
+    """Tests reading non-empty lines."""
+    stream = io.StringIO('{"username": "a"}\n\n  \n{"username": "b"}')
+    assert list(read_lines(stream)) == ['{"username": "a"}', '{"username": "b"}']
+
+
+def test_invalid_lines(make_config):
+    """Tests results of invalid lines without launching a browser."""
+    config = make_config()
+
+    result = process_line('not json', None, config)
+    assert result['outcome'] == 'failed'
+    assert result['error'].startswith("Invalid JSON")
+
+    result = process_line('{"username": "alice"}', None, config)
+    assert result['outcome'] == 'failed'
+    assert result['username'] == 'alice'
+    assert result['error'] == "Invalid PythonAnywhere credentials."
+
+
+class FailingSession:
+    def process(self, credentials, timings=None):
+        timings['open_page'] = 0.1234
+        raise TimeoutError("Timeout logging in after 30s.")
+
+
+def test_failed_account_timings(make_config):
+    """Tests keeping the timings of a failed account."""
+    config = make_config()
+    line = '{"username": "alice", "password": "secret"}'
+    result = process_line(line, FailingSession(), config)
+    assert result['outcome'] == 'failed'
+    assert result['error'] == "TimeoutError: Timeout logging in after 30s."
+    assert result['timings'] == {'open_page': 0.123}
+
+
+class FlushedStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushed = ''
+
+    def flush(self):
+        self.flushed = self.getvalue()
+
+
+def test_run_stream(monkeypatch, make_config):
+    """Tests writing and flushing each result as soon as its account
+    finishes.
+    """
+    out = FlushedStream()
+    # Results flushed before each account starts
+    seen = []
+
+    class FakeSession:
+        def __init__(self, config, logger, metrics):
+            self.config = config
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def process(self, credentials, timings=None):
+            seen.append(out.flushed.count("\n"))
+            if credentials['password'] == 'wrong':
+                raise RuntimeError("Unable to log in")
+            pm = PageManager(None, credentials, '', '', self.config)
+            pm.expiry_date = 'date'
+            return pm
+
+    monkeypatch.setattr(stream, 'Session', FakeSession)
+    lines = [
+        '{"username": "alice", "password": "secret"}',
+        '{"username": "bob", "password": "wrong"}',
+        '{"username": "carol", "password": "secret"}',
+    ]
+    assert run_stream(iter(lines), make_config(), out=out) == 1
+    assert seen == [0, 1, 2]
+
+    results = [json.loads(line) for line in out.flushed.splitlines()]
+    assert [r['username'] for r in results] == ['alice', 'bob', 'carol']
+    assert [r['outcome'] for r in results] == ['peeked', 'failed', 'peeked']
+    assert results[0]['expiry_date'] == 'date'
+    assert results[1]['error'] == "RuntimeError: Unable to log in"
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# tests/test_watchdog.py
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from pythonanywhere_3_months import watchdog
+from pythonanywhere_3_months.processes import _descendants, children, reap
+from pythonanywhere_3_months.watchdog import DeadlineExceeded, Watchdog
+
+
+def test_remaining():
+    """Tests the time left before the nearest deadline."""
+    wd = Watchdog(account_timeout=10, run_timeout=100)
+    assert wd.remaining() is None
+    with wd.account():
+        assert 9 < wd.remaining() <= 10
+    assert wd.remaining() is None
+    with wd.deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded, match="0.01s"):
+            wd.remaining()
+
+
+def test_start_run():
+    """Tests that the run deadline only starts with `start_run()`."""
+    with Watchdog(run_timeout=100) as wd:
+        assert wd.remaining() is None
+        wd.start_run()
+        deadline = wd.run_deadline
+        assert 99 < wd.remaining() <= 100
+        wd.start_run()
+        assert wd.run_deadline == deadline
+
+
+def test_idle_run_deadline(monkeypatch):
+    """Tests that nothing is killed past the run deadline while idle, only
+    while a step is running.
+    """
+    monkeypatch.setattr(watchdog, 'GRACE_PERIOD', 0)
+    monkeypatch.setattr(watchdog, 'POLL_INTERVAL', 0.01)
+    kills = []
+    monkeypatch.setattr(Watchdog, 'kill', lambda self: kills.append(self))
+    with Watchdog(run_timeout=0.01) as wd:
+        wd.start_run()
+        time.sleep(0.1)
+        assert not kills
+        with pytest.raises(DeadlineExceeded, match="Run deadline"):
+            wd.remaining()
+        with wd.deadline(0):
+            time.sleep(0.1)
+        assert kills == [wd]
+
+
+def test_descendants():
+    """Tests walking the process table from a root."""
+    table = {2: (1, 0), 3: (2, 0), 4: (3, 0), 5: (1, 0), 6: (9, 0)}
+    assert _descendants(1, table) == [2, 5, 3, 4]
+    assert _descendants(3, table) == [4]
+    assert _descendants(6, table) == []
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="needs waitpid")
+def test_reap():
+    """Tests waiting for a killed child to exit, so no zombie is left."""
+    child = subprocess.Popen(['sleep', '100'])
+    child.kill()
+    assert reap([child.pid]) == []
+    with pytest.raises(ChildProcessError):
+        os.waitpid(child.pid, os.WNOHANG)
+    # Already reaped
+    assert reap([child.pid]) == []
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="needs ps")
+def test_kill_scope():
+    """Tests that only the tracked drivers' processes are killed."""
+    # A fake driver with a fake browser under it
+    driver = subprocess.Popen(
+        [
+            sys.executable,
+            '-c',
+            "import subprocess, time; "
+            "subprocess.Popen(['sleep', '100']); time.sleep(100)",
+        ]
+    )
+    other = subprocess.Popen(['sleep', '100'])
+    try:
+        with Watchdog() as wd:
+            wd.track([driver.pid])
+            for _ in range(50):
+                if children(driver.pid):
+                    break
+                time.sleep(0.05)
+            browsers = wd.kill_browsers()
+            assert len(browsers) == 1
+            # The driver survives
+            assert driver.poll() is None
+        # Nothing is killed on a clean exit
+        assert driver.poll() is None
+        assert other.poll() is None
+
+        wd.kill()
+        assert driver.wait(timeout=5) is not None
+        assert other.poll() is None
+    finally:
+        for p in (driver, other):
+            p.kill()
+            p.wait()